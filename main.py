@@ -1,7 +1,9 @@
-import matplotlib.pyplot as plt
+import bisect
+import itertools
+import math
 import numpy as np
-import uuid
-from typing import Dict
+from typing import Dict, Optional
+from matplotlib.collections import LineCollection
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import tkinter as tk
@@ -19,20 +21,48 @@ STATION_COLOR = (50 / 255, 50 / 255, 200 / 255)
 # Line thickness
 LINE_THICKNESS = 4
 
+# Fixed animation timestep (~30fps) and the most steps run to catch up on one tick
+ANIMATION_STEP = 1 / 30
+MAX_CATCH_UP_STEPS = 5
+
+# Coordinates are screen-space values, well within float32 precision
+COORD_DTYPE = np.float32
+
+# Cell size of the spatial grid used for nearest-segment lookups
+GRID_CELL_SIZE = 50
+
 # Global list to keep references to track segments
 track_segments = []
 
+# Source of process-unique default segment IDs
+_ID = itertools.count()
+
 class Point:
     """
-    A 2D point.
+    An immutable 2D point.
     """
 
+    __slots__ = ("_x", "_y")
+
     def __init__(self, x, y):
-        self.x = x
-        self.y = y
+        self._x = x
+        self._y = y
+
+    @property
+    def x(self):
+        return self._x
+
+    @property
+    def y(self):
+        return self._y
 
     def distance_to(self, other):
-        return np.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    def sq_distance_to(self, other):
+        dx = self.x - other.x
+        dy = self.y - other.y
+        return dx * dx + dy * dy
 
     def __repr__(self):
         return f"({self.x:.1f}, {self.y:.1f})"
@@ -42,14 +72,25 @@ class TrackSegment:
     Default class for a track segment.
     """
 
+    __slots__ = ("id", "connections", "store", "index", "_color")
+
     def __init__(self, id=None):
-        self.id = id or str(uuid.uuid4())[:8]
+        self.id = id if id is not None else f"seg{next(_ID):06d}"
         self.connections = {}
+        # Store holding this segment's arrays, and its row in them
+        self.store = None
+        self.index = None
         self.color = TRACK_COLOR
 
-    def draw(self, ax):
-        """Draw the track segment on the Matplotlib axes."""
-        raise NotImplementedError("Subclasses must implement this method")
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, color):
+        self._color = color
+        if self.store is not None:
+            self.store.set_color(self.index, color)
 
     def get_point_at_distance(self, start_point, distance) -> Point:
         """Get coordinates at a specific distance from a start point."""
@@ -76,30 +117,41 @@ class StraightTrackSegment(TrackSegment):
     Straight track segment with rounded caps.
     """
 
+    __slots__ = ("_start", "_end", "_length", "_dx", "_dy")
+
     def __init__(self, start: Point, end: Point, id=None):
         super().__init__(id)
-        self.start = start
-        self.end = end
-        self.length = start.distance_to(end)
-
-    def draw(self, ax):
-        """Draw the track segment on the Matplotlib axes."""
-        ax.plot([self.start.x, self.end.x],
-                [self.start.y, self.end.y],
-                color=self.color,
-                linewidth=LINE_THICKNESS,
-                solid_capstyle='round')
+        # Geometry is fixed at construction; the store mirrors it
+        self._start = Point(float(start.x), float(start.y))
+        self._end = Point(float(end.x), float(end.y))
+        self._length = self._start.distance_to(self._end)
+
+        # Unit direction from start to end, reused by get_point_at_distance
+        if self._length:
+            self._dx = (self._end.x - self._start.x) / self._length
+            self._dy = (self._end.y - self._start.y) / self._length
+        else:
+            self._dx = self._dy = 0.0
+
+    @property
+    def start(self) -> Point:
+        return self._start
+
+    @property
+    def end(self) -> Point:
+        return self._end
+
+    @property
+    def length(self) -> float:
+        return self._length
 
     def get_point_at_distance(self, start_point, distance) -> Point:
         """Determines which point end is the start point."""
-        t = distance / self.length
-        if start_point.distance_to(self.start) < 1:
-            x = self.start.x + t * (self.end.x - self.start.x)
-            y = self.start.y + t * (self.end.y - self.start.y)
-        else:
-            x = self.end.x + t * (self.start.x - self.end.x)
-            y = self.end.y + t * (self.start.y - self.end.y)
-        return Point(x, y)
+        if start_point.sq_distance_to(self.start) < 1.0:
+            return Point(self.start.x + distance * self._dx,
+                         self.start.y + distance * self._dy)
+        return Point(self.end.x - distance * self._dx,
+                     self.end.y - distance * self._dy)
 
     def get_length(self) -> float:
         return self.length
@@ -108,6 +160,170 @@ class StraightTrackSegment(TrackSegment):
         return {"start": self.start, "end": self.end}
 
 
+class TrackStore:
+    """
+    Contiguous arrays holding the geometry of the straight track segments.
+    """
+
+    def __init__(self):
+        self.segments = []
+        self.starts_xy = np.empty((0, 2), dtype=COORD_DTYPE)
+        self.ends_xy = np.empty((0, 2), dtype=COORD_DTYPE)
+        self.lengths = np.empty(0, dtype=COORD_DTYPE)
+        self.colors = np.empty((0, 3), dtype=COORD_DTYPE)
+
+        # Bumped whenever the segment geometry or colors change
+        self.version = 0
+        self.color_version = 0
+
+        # Spatial grid: cell -> indices of the segments with an endpoint in it
+        self._grid = {}
+
+    def __len__(self):
+        return len(self.segments)
+
+    def add(self, segment: StraightTrackSegment) -> int:
+        """Append a straight segment to the arrays and attach it to the store."""
+        self.extend((segment,))
+        return segment.index
+
+    def extend(self, segments):
+        """Append straight segments, growing each array once for the whole batch."""
+        segments = list(segments)
+
+        # Validate the whole batch before touching any array
+        for segment in segments:
+            if segment.store is not None:
+                raise ValueError(f"Segment {segment.id} is already in a track store")
+            coords = (segment.start.x, segment.start.y, segment.end.x, segment.end.y)
+            if not all(map(math.isfinite, coords)):
+                raise ValueError(f"Segment {segment.id} has non-finite coordinates")
+        if len(set(map(id, segments))) != len(segments):
+            raise ValueError("The same segment appears more than once")
+        cells = [self._endpoint_cells(segment) for segment in segments]
+
+        starts = [(s.start.x, s.start.y) for s in segments]
+        ends = [(s.end.x, s.end.y) for s in segments]
+        self.starts_xy = np.concatenate((self.starts_xy, np.reshape(starts, (-1, 2))), dtype=COORD_DTYPE)
+        self.ends_xy = np.concatenate((self.ends_xy, np.reshape(ends, (-1, 2))), dtype=COORD_DTYPE)
+        self.lengths = np.concatenate((self.lengths, [s.length for s in segments]), dtype=COORD_DTYPE)
+        self.colors = np.concatenate((self.colors, np.reshape([s.color for s in segments], (-1, 3))),
+                                     dtype=COORD_DTYPE)
+
+        for segment, segment_cells in zip(segments, cells):
+            self._attach(segment, segment_cells)
+        self.version += 1
+        self.color_version += 1
+
+    def _attach(self, segment, cells):
+        index = len(self.segments)
+        self.segments.append(segment)
+        segment.store = self
+        segment.index = index
+        for cell in cells:
+            self._grid.setdefault(cell, []).append(index)
+
+    def _endpoint_cells(self, segment):
+        return {self._cell(segment.start.x, segment.start.y), self._cell(segment.end.x, segment.end.y)}
+
+    def set_color(self, index, color):
+        """Set the color of the segment at an index."""
+        self.colors[index] = color
+        self.color_version += 1
+
+    def nearest(self, point: Point) -> Optional[int]:
+        """Get the index of the segment with the endpoint closest to a point."""
+        if not self.segments:
+            return None
+
+        # Any endpoint within one cell of the point lies in the 3x3 cells around it
+        cx, cy = self._cell(point.x, point.y)
+        candidates = set()
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                candidates.update(self._grid.get((cx + dx, cy + dy), ()))
+        if candidates:
+            indices = np.fromiter(candidates, dtype=np.intp, count=len(candidates))
+            d2 = self._endpoint_sq_distances(point, indices)
+            best = d2.argmin()
+            if d2[best] <= GRID_CELL_SIZE ** 2:
+                return int(indices[best])
+
+        return int(self._endpoint_sq_distances(point).argmin())
+
+    def _endpoint_sq_distances(self, point, indices=slice(None)):
+        p = np.array((point.x, point.y), dtype=COORD_DTYPE)
+        to_start = self.starts_xy[indices] - p
+        to_end = self.ends_xy[indices] - p
+        return np.minimum(np.einsum('ij,ij->i', to_start, to_start),
+                          np.einsum('ij,ij->i', to_end, to_end))
+
+    @staticmethod
+    def _cell(x, y):
+        return int(x // GRID_CELL_SIZE), int(y // GRID_CELL_SIZE)
+
+    def get_segments_xy(self) -> np.ndarray:
+        """Get an (N, 2, 2) array of start/end pairs, as used by LineCollection."""
+        return np.stack((self.starts_xy, self.ends_xy), axis=1)
+
+# Global store backing the straight track segments
+track_store = TrackStore()
+
+
+def segments_from_layout(layout) -> list:
+    """Create straight segments from rows of (x0, y0, x1, y1)."""
+    return [StraightTrackSegment(Point(x0, y0), Point(x1, y1)) for x0, y0, x1, y1 in layout]
+
+
+def register(*segments: TrackSegment):
+    """Add track segments to the network and file them in their typed store."""
+    # The store validates the batch first, so a rejected call changes nothing
+    track_store.extend(s for s in segments if isinstance(s, StraightTrackSegment))
+    track_segments.extend(segments)
+
+
+class TrackPath:
+    """
+    Ordered chain of connected track segments, traversed by distance.
+    """
+
+    def __init__(self, segments=(), start: Optional[Point] = None):
+        self.segments = []
+        self._entries = []
+        self._cum = [0.0]  # Cumulative length at the start of each segment
+        self._exit = start
+        for segment in segments:
+            self.add(segment)
+
+    def add(self, segment: TrackSegment):
+        """Append a segment connected to the current end of the path."""
+        points = list(segment.get_connection_points().values())
+        if self._exit is None:
+            entry = points[0]
+        else:
+            entry = min(points, key=self._exit.sq_distance_to)
+            if entry.sq_distance_to(self._exit) >= 1.0:
+                raise ValueError(f"Segment {segment.id} does not connect to the end of the path")
+        self._exit = segment.get_point_at_distance(entry, segment.get_length())
+
+        self.segments.append(segment)
+        self._entries.append(entry)
+        self._cum.append(self._cum[-1] + segment.get_length())
+
+    def get_length(self) -> float:
+        return self._cum[-1]
+
+    def get_point_at_distance(self, distance) -> Optional[Point]:
+        """Get coordinates at a specific distance along the path."""
+        if not self.segments:
+            return None
+
+        # Stay on the track: clamp to the ends of the path
+        distance = min(max(distance, 0.0), self.get_length())
+        i = min(bisect.bisect_right(self._cum, distance) - 1, len(self.segments) - 1)
+        return self.segments[i].get_point_at_distance(self._entries[i], distance - self._cum[i])
+
+
 class TrackViewer(tk.Tk):
     """
     Tkinter window to display the track network using Matplotlib.
@@ -133,46 +349,90 @@ class TrackViewer(tk.Tk):
         self.ax.set_ylim(300, 700)
         self.ax.axis('off')  # Hide the axes
 
+        # All track segments are drawn as a single collection. It is animated,
+        # so it is blitted over a cached background instead of redrawing the figure.
+        self._line_coll = LineCollection([], linewidths=LINE_THICKNESS, capstyle='round',
+                                         animated=True)
+        self.ax.add_collection(self._line_coll)
+        self._drawn_version = None
+        self._drawn_color_version = None
+        self._bg = None
+
         # Create the canvas
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.frame)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
         # Draw the track segments
         self.update_display()
 
-        # Animation variables
+        # Animation variables; ticks are only scheduled while running
         self.animation_running = False
         self.after_id = None
-
-        # Start animation
-        self.animate()
+        self._last_tick = 0.0
+        self._lag = 0.0
 
     def animate(self):
         """Basic animation loop."""
-        if self.animation_running:
-            # Add animation code here
-            pass
+        if not self.animation_running:
+            self.after_id = None
+            return
 
-        self.after_id = self.after(33, self.animate)  # ~30fps
+        now = time.perf_counter()
+        self._lag = min(self._lag + now - self._last_tick, MAX_CATCH_UP_STEPS * ANIMATION_STEP)
+        self._last_tick = now
 
-    def update_display(self):
-        """Update the display with all track segments."""
-        self.ax.clear()
-        self.ax.set_facecolor('#000000')
-        self.ax.set_xlim(300, 900)
-        self.ax.set_ylim(300, 700)
-        self.ax.axis('off')
+        # Advance in fixed steps, running extra ones if the timer fired late
+        while self._lag >= ANIMATION_STEP:
+            self.step(ANIMATION_STEP)
+            self._lag -= ANIMATION_STEP
 
-        # Draw all track segments
-        for segment in track_segments:
-            segment.draw(self.ax)
+        self._schedule_tick()
 
-        self.canvas.draw()
+    def step(self, dt):
+        """Advance the animation state by dt seconds."""
+        # Add animation code here
+        pass
+
+    def _schedule_tick(self):
+        # Aim at the next step boundary so after() jitter does not accumulate
+        delay = max(1, round((ANIMATION_STEP - self._lag) * 1000))
+        self.after_id = self.after(delay, self.animate)
+
+    def update_display(self):
+        """Update the display with all track segments."""
+        # Only push the data that changed since the last update
+        if self._drawn_version != track_store.version:
+            self._line_coll.set_segments(track_store.get_segments_xy())
+            self._drawn_version = track_store.version
+        if self._drawn_color_version != track_store.color_version:
+            self._line_coll.set_colors(track_store.colors)
+            self._drawn_color_version = track_store.color_version
+
+        if self._bg is None:
+            self.canvas.draw()
+            return
+
+        self.canvas.restore_region(self._bg)
+        self.ax.draw_artist(self._line_coll)
+        self.canvas.blit(self.ax.bbox)
+
+    def on_draw(self, event):
+        """Cache the static background after a full redraw (e.g. on resize)."""
+        self._bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self._line_coll)
 
     def toggle_animation(self):
         """Toggle animation on/off."""
         self.animation_running = not self.animation_running
+        if self.animation_running:
+            self._last_tick = time.perf_counter()
+            self._lag = 0.0
+            self._schedule_tick()
+        elif self.after_id:
+            self.after_cancel(self.after_id)
+            self.after_id = None
 
     def __del__(self):
         if self.after_id:
@@ -180,11 +440,11 @@ class TrackViewer(tk.Tk):
 
 
 def main():
-    main_line = StraightTrackSegment(Point(450, 500), Point(600, 500))
-    connected_line = StraightTrackSegment(Point(600, 500), Point(710, 620))
-
-    track_segments.append(main_line)
-    track_segments.append(connected_line)
+    # Network layout as rows of (x0, y0, x1, y1)
+    register(*segments_from_layout([
+        (450, 500, 600, 500),
+        (600, 500, 710, 620),
+    ]))
 
     window = TrackViewer()
     window.mainloop()